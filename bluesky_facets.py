@@ -1,106 +1,192 @@
 # bluesky_facets.py
 import re
-import requests
-from typing import List, Dict
+import asyncio
+import aiohttp
+from operator import itemgetter
+from typing import List, Dict, Optional
 
-def parse_mentions(text: str) -> List[Dict]:
+try:
+    # Optional: google-re2 (pip install google-re2) matches in linear time, so the nested
+    # quantifiers in the URL pattern can't backtrack badly on odd input.
+    import re2 as _regex_engine
+except ImportError:
+    _regex_engine = re
+
+_MENTION_PATTERN = rb"(?P<mention>@(?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)"
+_URL_PATTERN = rb"(?P<url>https?:\/\/(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b(?:[-a-zA-Z0-9()@:%_\+.~#?&//=]*[-a-zA-Z0-9@%_\+~#//=])?)"
+_TAG_PATTERN = rb"(?P<tag>#[a-zA-Z0-9_]+)"
+
+def _compile_facet_re(*patterns: bytes):
     """
-    Extracts and returns a list of mentions from the input text, including their positions and handles.
+    Compiles facet patterns into a single alternation behind the shared `[$|\W]` boundary character.
+    """
+    return _regex_engine.compile(rb"[$|\W](?:" + rb"|".join(patterns) + rb")")
+
+def _group_kinds(facet_re) -> tuple:
     """
+    Maps each group number of a compiled facet regex to its facet kind.
+    re2 reports bytes group names, so matches are dispatched on `lastindex` through this table.
     """
-    Parses mentions from a given text and returns a list of dictionaries with their positions and handles.
+    kinds = [None] * (facet_re.groups + 1)
+    for name, index in facet_re.groupindex.items():
+        kinds[index] = name.decode() if isinstance(name, bytes) else name
+    return tuple(kinds)
+
+# Mentions and tags are matched in a single pass over the text. Each alternative captures
+# into its own group, so `lastindex` tells us which kind of facet was found. Neither can
+# contain the other or the boundary character in front of it, so sharing a pass loses nothing.
+# Compiled once at import.
+_MENTION_TAG_RE = _compile_facet_re(_MENTION_PATTERN, _TAG_PATTERN)
+_MENTION_TAG_GROUP_KINDS = _group_kinds(_MENTION_TAG_RE)
+
+# URLs get a pass of their own. A URL can start at a tag's '#' ("#https://...") or contain
+# '@' and '#', so in a shared alternation whichever matched first would hide the other.
+# Without "http" in the text it can never match. Archived tweets usually carry only t.co
+# links, which are stripped before posting, so most posts skip this pass.
+_URL_RE = _compile_facet_re(_URL_PATTERN)
+_URL_GROUP_KINDS = _group_kinds(_URL_RE)
+
+# Span value key for each facet kind. Mentions and tags drop their leading '@' / '#'.
+_SPAN_KEYS = {
+    "mention": "handle",
+    "url": "url",
+    "tag": "tag",
+}
+
+# Richtext facet feature `$type` and value key for each facet kind.
+_FACET_FEATURES = {
+    "mention": ("app.bsky.richtext.facet#mention", "did"),
+    "url": ("app.bsky.richtext.facet#link", "uri"),
+    "tag": ("app.bsky.richtext.facet#tag", "tag"),
+}
+
+def _facet(start: int, end: int, feature_type: str, feature_key: str, value: str) -> Dict:
+    """
+    Builds a single richtext facet covering the bytes [start, end) with one feature.
+    """
+    return {
+        "index": {
+            "byteStart": start,
+            "byteEnd": end,
+        },
+        "features": [
+            {
+                "$type": feature_type,
+                feature_key: value,
+            }
+        ],
+    }
+
+def parse_spans(text_bytes: bytes) -> List[Dict]:
+    """
+    Scans the UTF-8 encoded text and returns a list of mention, URL, and tag spans in text order.
+    Each span carries its `kind`, byte positions, and the handle/url/tag value.
+    """
+    spans = _scan_spans(text_bytes, _MENTION_TAG_RE, _MENTION_TAG_GROUP_KINDS)
+    if b"http" in text_bytes:
+        url_spans = _scan_spans(text_bytes, _URL_RE, _URL_GROUP_KINDS)
+        if url_spans:
+            spans = sorted(spans + url_spans, key=itemgetter("start"))
+    return spans
+
+def _scan_spans(text_bytes: bytes, facet_re, group_kinds: tuple) -> List[Dict]:
+    """
+    Returns the spans one compiled facet regex finds in the text, in text order.
     """
     spans = []
-    mention_regex = rb"[$|\W](@([a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+[a-zA-Z]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)"
-    text_bytes = text.encode("UTF-8")
-    for m in re.finditer(mention_regex, text_bytes):
+    for m in facet_re.finditer(text_bytes):
+        group = m.lastindex
+        kind = group_kinds[group]
+        start, end = m.span(group)
+        # Decode the value straight out of text_bytes, skipping the '@' / '#' by offset.
+        value_start = start if kind == "url" else start + 1
         spans.append({
-            "start": m.start(1),
-            "end": m.end(1),
-            "handle": m.group(1)[1:].decode("UTF-8")
+            "kind": kind,
+            "start": start,
+            "end": end,
+            _SPAN_KEYS[kind]: text_bytes[value_start:end].decode("UTF-8"),
         })
     return spans
 
+def parse_mentions(text: str) -> List[Dict]:
+    """
+    Extracts and returns a list of mentions from the input text, including their positions and handles.
+    """
+    return [span for span in parse_spans(text.encode("UTF-8")) if span["kind"] == "mention"]
+
 def parse_urls(text: str) -> List[Dict]:
     """
     Extracts and returns a list of URLs from the input text, including their positions.
     """
-    spans = []
-    url_regex = rb"[$|\W](https?:\/\/(www\.)?[-a-zA-Z0-9@:%._\+~#=]{1,256}\.[a-zA-Z0-9()]{1,6}\b([-a-zA-Z0-9()@:%_\+.~#?&//=]*[-a-zA-Z0-9@%_\+~#//=])?)"
-    text_bytes = text.encode("UTF-8")
-    for m in re.finditer(url_regex, text_bytes):
-        spans.append({
-            "start": m.start(1),
-            "end": m.end(1),
-            "url": m.group(1).decode("UTF-8"),
-        })
-    return spans
+    return [span for span in parse_spans(text.encode("UTF-8")) if span["kind"] == "url"]
 
 def parse_tags(text: str) -> List[Dict]:
     """
     Extracts and returns a list of tags from the input text, including their positions.
     """
-    spans = []
-    tag_regex = rb"[$|\W](#([a-zA-Z0-9_]+))"
-    text_bytes = text.encode("UTF-8")
-    for h in re.finditer(tag_regex, text_bytes):
-        spans.append({
-            "start": h.start(1),
-            "end": h.end(1),
-            "tag": h.group(1)[1:].decode("UTF-8")
-        })
-    return spans
+    return [span for span in parse_spans(text.encode("UTF-8")) if span["kind"] == "tag"]
 
-def parse_facets(text: str, pds_url: str) -> List[Dict]:
+async def resolve_handle(session: aiohttp.ClientSession, pds_url: str, handle: str, did_cache: Dict[str, Optional[str]]) -> Optional[str]:
+    """
+    Resolves a handle to its DID, returning None if the PDS does not know the handle.
+    Other error responses raise aiohttp.ClientResponseError.
+    Results are kept in `did_cache` so repeated mentions of a handle only hit the PDS once.
+    """
+    if handle in did_cache:
+        return did_cache[handle]
+
+    async with session.get(
+        pds_url + "/xrpc/com.atproto.identity.resolveHandle",
+        params={"handle": handle},
+    ) as resp:
+        if resp.status == 400:
+            # The PDS doesn't know the handle, which won't change during the run.
+            did = None
+        else:
+            # Anything else that fails (rate limits, 5xx) may be transient, so it raises and isn't cached.
+            resp.raise_for_status()
+            did = (await resp.json()).get("did")
+
+    did_cache[handle] = did
+    return did
+
+async def parse_facets(text: str, pds_url: str, session: aiohttp.ClientSession, did_cache: Dict[str, Optional[str]]) -> List[Dict]:
     """
     Parses text to extract mentions, URLs, and tags, resolving handles to DIDs, and returns a list of facets with their positions and features.
     """
     facets = []
-    for mention in parse_mentions(text):
-        resp = requests.get(
-            pds_url + "/xrpc/com.atproto.identity.resolveHandle",
-            params={"handle": mention["handle"]},
-        )
-        if resp.status_code == 400:
+    text_bytes = text.encode("UTF-8")  # Byte offsets are what the facet index expects.
+
+    # Most tweets carry no facet markers at all. Those skip the scan and handle resolution.
+    if b"@" not in text_bytes and b"#" not in text_bytes and b"http" not in text_bytes:
+        return facets
+
+    # The scan runs inline on purpose. A post is at most 300 characters, and the stdlib `re`
+    # engine holds the GIL while matching, so asyncio.to_thread or a thread pool would only
+    # add a thread hop per post without running scans in parallel.
+    spans = parse_spans(text_bytes)
+
+    # Resolve every distinct handle concurrently rather than one round-trip per mention.
+    handles = list(dict.fromkeys(span["handle"] for span in spans if span["kind"] == "mention"))
+    results = await asyncio.gather(
+        *(resolve_handle(session, pds_url, handle, did_cache) for handle in handles),
+        return_exceptions=True,
+    )
+    dids = {}
+    for handle, result in zip(handles, results):
+        if isinstance(result, Exception):
+            print(f"Could not resolve handle @{handle}: {result}")
             continue
-        did = resp.json().get("did")
-        facets.append({
-            "index": {
-                "byteStart": mention["start"],
-                "byteEnd": mention["end"],
-            },
-            "features": [
-                {
-                    "$type": "app.bsky.richtext.facet#mention", 
-                    "did": did}],
-                }
-        )
-    for url in parse_urls(text):
-        facets.append({
-            "index": {
-                "byteStart": url["start"],
-                "byteEnd": url["end"],
-            },
-            "features": [
-                {
-                    "$type": "app.bsky.richtext.facet#link",
-                    "uri": url["url"],
-                }
-            ],
-        })
-    for tag in parse_tags(text):
-        facets.append({
-            "index": {
-                "byteStart": tag["start"],
-                "byteEnd": tag["end"],
-            },
-            "features": [
-                {
-                    "$type": "app.bsky.richtext.facet#tag",
-                    "tag": tag["tag"]
-                }
-            ],
-        })
+        dids[handle] = result
 
+    for span in spans:
+        if span["kind"] == "mention":
+            value = dids.get(span["handle"])
+            if value is None:
+                continue
+        else:
+            value = span[_SPAN_KEYS[span["kind"]]]
+        feature_type, feature_key = _FACET_FEATURES[span["kind"]]
+        facets.append(_facet(span["start"], span["end"], feature_type, feature_key, value))
 
     return facets
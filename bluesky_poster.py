@@ -1,19 +1,131 @@
 from bluesky_facets import parse_facets
-from bluesky_video import BlueskyVideo
 from tweet_archive_parser import TweetArchiveParser
 import os
 import sys
-import re
 import json
+import base64
+import io
+import logging
 from typing import Dict, List
 from pathlib import Path
 import mimetypes
 import asyncio
 import aiohttp
+import aiofiles
+import aiofiles.os
 from datetime import datetime, timezone
 from datetime import timedelta
 from dotenv import load_dotenv
 
+try:
+    # Optional: orjson (pip install orjson) is a much faster drop-in for the request/response JSON.
+    import orjson
+
+    def _json_dumps(obj, indent=False):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+
+    # orjson already produces UTF-8 bytes, which go straight out as the request body.
+    _json_body = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_dumps(obj, indent=False):
+        return json.dumps(obj, indent=2 if indent else None)
+
+    def _json_body(obj):
+        return json.dumps(obj).encode("utf-8")
+
+    _json_loads = json.loads
+
+# Request headers for a JSON body built with _json_body.
+_JSON_CONTENT_TYPE = {"Content-Type": "application/json"}
+
+try:
+    # Optional: Pillow (pip install Pillow) lets oversized images be recompressed instead of rejected.
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# uploadBlob's size limit for images.
+_MAX_IMAGE_BYTES = 1000000
+
+# Bluesky's size limit for videos.
+_MAX_VIDEO_BYTES = 100 * 1024 * 1024
+
+# Videos can take far longer than the session's 30 second total to send, so only connecting and
+# waiting on the PDS between reads are bounded.
+_VIDEO_UPLOAD_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+
+# Where the refresh token is kept between runs, so each run doesn't need a fresh password login.
+SESSION_CACHE_DIR = Path.home() / ".cache" / "leaving-x"
+
+_TCO_PREFIX = "https://t.co/"
+
+# createdAt timestamps, always UTC. A trailing "Z" is preferred over "+00:00".
+_CREATED_AT_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+def _strip_tco_links(text):
+    """
+    Removes every t.co link from the text, matching re.sub(r"https://t\.co/\S+", "", text).
+    t.co links always start with the same fixed prefix, so plain str.find does the job without the regex engine.
+    """
+    if _TCO_PREFIX not in text:
+        return text
+
+    parts = []
+    keep_from = 0
+    i = text.find(_TCO_PREFIX)
+    while i != -1:
+        link_start = i + len(_TCO_PREFIX)
+        end = link_start
+        while end < len(text) and not text[end].isspace():
+            end += 1
+        if end > link_start:  # A bare prefix with nothing after it is not a link.
+            parts.append(text[keep_from:i])
+            keep_from = end
+        i = text.find(_TCO_PREFIX, end)
+    parts.append(text[keep_from:])
+    return "".join(parts)
+
+def _jwt_expiry(token):
+    """
+    Returns the `exp` claim of a JWT as a UTC datetime, or None if the token has no readable expiry.
+    The signature is not checked; the PDS does that. We only need to know when to refresh.
+    """
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return datetime.fromtimestamp(claims['exp'], tz=timezone.utc)
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def _shrink_image(image_bytes):
+    """
+    Re-encodes an image as a JPEG without its EXIF metadata, scaling it down until it fits within _MAX_IMAGE_BYTES.
+    Pillow does the heavy lifting, so call this from a worker thread.
+    """
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(image_bytes)))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")  # JPEG has no alpha channel or palette.
+
+    while True:
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=85, optimize=True, progressive=True)
+        if out.tell() <= _MAX_IMAGE_BYTES or min(image.size) <= 256:
+            return out.getvalue()
+        image = image.resize((image.width * 3 // 4, image.height * 3 // 4))
+
+async def _iter_file_chunks(file, chunk_size=64 * 1024):
+    """
+    Yields an open aiofiles file in chunks so uploads stream from disk instead of being read into memory first.
+    """
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
 class BlueskyPoster:
     """
         A class to handle posting and managing sessions with a Bluesky server.
@@ -29,23 +141,51 @@ class BlueskyPoster:
             session_lock (asyncio.Lock): A lock to manage session creation.
             session (dict): The current session information.
             session_expiry (datetime): The expiry time of the current session.
+            media_folder (Path): The folder holding the archive's media files, if given at construction.
+            _http (aiohttp.ClientSession): The HTTP session shared by all requests, created on first use.
+            _session_file (Path): Where the session's refresh token is saved for the next run.
         """
-    def __init__(self, pds_url, handle, password):
+    def __init__(self, pds_url, handle, password, media_folder=None):
         """
-        Initializes the instance with server URL, user handle, and password, and sets up session management attributes.
+        Initializes the instance with server URL, user handle, password, and optional media folder, and sets up session management attributes.
         """
         self.pds_url = pds_url
         self.handle = handle
         self.password = password
+        self.media_folder = Path(media_folder) if media_folder else None
         self.access_jwt = None
         self.did = None
         self.session_lock = asyncio.Lock()
         self.session = None
         self.session_expiry = None
+        self._did_cache = {}  # handle -> DID, shared by every post made through this instance
+        self._built_posts = {}  # tweet_id -> post record awaiting a successful createRecord
+        self._http = None
+        self._upload_semaphore = asyncio.Semaphore(4)
+        # Keyed by handle so switching accounts doesn't pick up the wrong session.
+        self._session_file = SESSION_CACHE_DIR / f"session-{handle}"
+
+    async def _get_http(self) -> aiohttp.ClientSession:
+        """
+        Returns the aiohttp session shared by every request this instance makes, creating it on first use.
+        Reusing one session keeps DNS results and TLS connections to the PDS alive between requests.
+        """
+        if self._http is None or self._http.closed:
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300, keepalive_timeout=120),
+                timeout=aiohttp.ClientTimeout(total=30),
+                headers={"User-Agent": "leaving-x/1.0"},
+            )
+        return self._http
+
+    async def close(self):
+        """
+        Closes the shared aiohttp session. Call once the poster is no longer needed.
+        """
+        if self._http is not None and not self._http.closed:
+            await self._http.close()
+        self._http = None
 
-        # Initialize the new video uploader class
-        self.video_uploader = BlueskyVideo(pds_url, handle, password)
-    
     async def bsky_login_session(self, pds_url: str, handle: str, password: str) -> Dict:
         """
             Initiates an asynchronous login session with a Bluesky server.
@@ -59,17 +199,17 @@ class BlueskyPoster:
                 A dictionary containing the session data if successful, or None if an error occurs.
             """  # Make bsky_login_session async
 
-        headers = {'Content-Type': 'application/json'}
+        headers = _JSON_CONTENT_TYPE
 
         try:
-            async with aiohttp.ClientSession() as session:  # Use aiohttp for async requests
-                resp = await session.post(  # Use await for the async post request
-                    pds_url + "/xrpc/com.atproto.server.createSession",
-                    json={"identifier": handle, "password": password},
-                    headers=headers
-                )
+            session = await self._get_http()
+            async with session.post(  # Use aiohttp for async requests
+                pds_url + "/xrpc/com.atproto.server.createSession",
+                data=_json_body({"identifier": handle, "password": password}),
+                headers=headers
+            ) as resp:
                 resp.raise_for_status()  # This will raise an exception for 4xx and 5xx status codes
-                return await resp.json()  # Use await for async json response
+                return await resp.json(loads=_json_loads)  # Use await for async json response
         except aiohttp.ClientError as e:  # Catch aiohttp exceptions
             print(f"An error occurred during the request: {e}")
             return None
@@ -77,52 +217,156 @@ class BlueskyPoster:
             print(f"An unexpected error occurred: {e}")
             return None
 
+    async def bsky_refresh_session(self, pds_url: str, refresh_jwt: str) -> Dict:
+        """
+            Exchanges a refresh token for a new session with com.atproto.server.refreshSession,
+            avoiding a full password login when only the access token has expired.
+        
+            Args:
+                pds_url: The URL of the Bluesky server.
+                refresh_jwt: The `refreshJwt` from the current session.
+        
+            Returns:
+                A dictionary containing the new session data if successful, or None if an error occurs.
+            """
+        try:
+            session = await self._get_http()
+            async with session.post(
+                pds_url + "/xrpc/com.atproto.server.refreshSession",
+                headers={"Authorization": "Bearer " + refresh_jwt},
+            ) as resp:
+                resp.raise_for_status()
+                return await resp.json(loads=_json_loads)
+        except aiohttp.ClientError as e:
+            print(f"Could not refresh session, logging in again: {e}")
+            return None
+        except asyncio.TimeoutError:
+            # A slow PDS trips the session's total timeout, which is not a ClientError.
+            print("Refreshing the session timed out, logging in again.")
+            return None
+
+    def _save_session(self):
+        """
+        Writes the current session's refreshJwt, did, and handle to the cache file, readable only by the current user.
+        The PDS rotates the refresh token on every refresh, so this runs after each login and refresh.
+        """
+        saved = {key: self.session.get(key) for key in ("refreshJwt", "did", "handle")}
+        # Written to a fresh 0600 temp file and swapped in, so a crash mid-write can't leave a truncated
+        # file behind, and the mode applies even if an older file was more permissive.
+        temp_file = self._session_file.with_name(self._session_file.name + ".tmp")
+        try:
+            self._session_file.parent.mkdir(parents=True, exist_ok=True)
+            if temp_file.exists():
+                temp_file.unlink()
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(_json_dumps(saved))
+            os.replace(temp_file, self._session_file)
+        except OSError as e:
+            print(f"Could not save session to {self._session_file}: {e}")
+
+    def _load_saved_refresh_jwt(self):
+        """
+        Returns the refresh token saved by an earlier run, or None if there is none.
+        """
+        try:
+            saved = _json_loads(self._session_file.read_bytes())
+            return saved.get("refreshJwt")
+        except (OSError, ValueError, AttributeError):
+            return None
+
     async def get_or_create_session(self):
         """
         Manages the session lifecycle, creating a new session if none exists or if the current session has expired.
+        An expired session is refreshed with its refresh token first, falling back to a full login.
+        On the first call, the refresh token saved by an earlier run is tried before logging in with the password.
         """  # No config argument needed here
         async with self.session_lock:
-            if self.session is None or (self.session_expiry and datetime.now(timezone.utc) > self.session_expiry):
-                self.session = await self.bsky_login_session(self.pds_url, self.handle, self.password)  # Use instance attributes
+            now = datetime.now(timezone.utc)
+            if self.session is None or (self.session_expiry and now > self.session_expiry):
+                new_session = None
+                if self.session:
+                    refresh_jwt = self.session.get("refreshJwt")
+                else:
+                    refresh_jwt = self._load_saved_refresh_jwt()
+                if refresh_jwt:
+                    new_session = await self.bsky_refresh_session(self.pds_url, refresh_jwt)
+                if new_session is None:
+                    new_session = await self.bsky_login_session(self.pds_url, self.handle, self.password)  # Use instance attributes
+                self.session = new_session
                 if self.session is None:
                     print("Authentication failed")
                     return None
 
-                # Assuming the session response includes `accessJwt` and a token expiry time in seconds (if available)
+                self._save_session()
                 self.access_jwt = self.session.get("accessJwt")
                 self.did = self.session.get("did")
+                # The session already tells us our own DID, so self-mentions never need resolving.
+                if self.session.get("handle") and self.did:
+                    self._did_cache[self.session["handle"]] = self.did
                 
-                # Set session expiry if token has an expiration field (adjust based on actual API response)
-                expiry_seconds = self.session.get("expires_in", 3600)  # Default to 1 hour if unspecified
-                self.session_expiry = datetime.now(timezone.utc) + timedelta(seconds=expiry_seconds)
+                # Expire a minute before the access token does, so it is refreshed before requests start failing.
+                # If the token's `exp` claim can't be read, assume one hour.
+                token_expiry = _jwt_expiry(self.access_jwt)
+                if token_expiry:
+                    self.session_expiry = token_expiry - timedelta(seconds=60)
+                else:
+                    self.session_expiry = now + timedelta(seconds=3600)
 
 
             return self.session
 
+    def _media_path(self, config, media_filename):
+        """
+        Returns the path of a media file, using the media folder given at construction or else config['media_folder'].
+        """
+        media_folder = self.media_folder or Path(config['media_folder'])
+        return media_folder / media_filename
+
     async def upload_video(self, config, media_filename):
         """
-        Delegates video upload and MANUALLY constructs a clean blob dictionary
-        to ensure API compatibility.
+        Uploads a video to a Bluesky server using com.atproto.repo.uploadBlob.
+
+        The video is streamed from disk over the same aiohttp session as every other request,
+        so it reuses the open connections to the PDS and the session already logged in for posting.
+
+        Args:
+        config: Configuration dictionary containing server details.
+        media_filename: Name of the video file within the media folder.
+
+        Returns:
+        The blob dictionary if the upload is successful, or None if an error occurs.
         """
-        media_path = f"{config['media_folder']}/{media_filename}"
-        
-        # This returns the atproto library's Pydantic model instance
-        video_blob_model = await self.video_uploader.upload(media_path)
-
-        if video_blob_model:
-            # Manually build the dictionary to match the Bluesky API lexicon ---
-            # Do NOT use model_dump(), as it includes extra internal fields.
-            clean_blob_dict = {
-                '$type': 'blob',
-                'ref': {
-                    '$link': str(video_blob_model.ref.link) # Use the CID string from the ref
-                },
-                'mimeType': video_blob_model.mime_type, # Use camelCase for JSON
-                'size': video_blob_model.size
-            }
-            return clean_blob_dict
-            
-        return None
+        media_path = self._media_path(config, media_filename)
+
+        try:
+            media_stat = await aiofiles.os.stat(media_path)
+        except OSError:
+            print(f"Video file does not exist: {media_path}")
+            return None
+
+        media_size = media_stat.st_size
+        if media_size > _MAX_VIDEO_BYTES:
+            print(f"Video file too large. {_MAX_VIDEO_BYTES} bytes maximum, got: {media_size}")
+            return None
+
+        mime_type, _ = mimetypes.guess_type(media_path)
+        if not mime_type or not mime_type.startswith('video/'):
+            mime_type = 'video/mp4'  # The archive stores videos as MP4
+
+        try:
+            print(f"Uploading video blob from {media_path}...")
+            async with self._upload_semaphore:
+                async with aiofiles.open(media_path, "rb") as media_file:
+                    blob = await self._upload_blob(
+                        config, _iter_file_chunks(media_file), mime_type, media_size, timeout=_VIDEO_UPLOAD_TIMEOUT
+                    )
+            print("Video blob uploaded successfully.")
+            return blob
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error uploading video: {e}")
+            return None
 
     async def upload_image(self, config, media_filename):
         """
@@ -130,15 +374,18 @@ class BlueskyPoster:
         
         Args:
         config: Configuration dictionary containing server details.
-        media_path: Path to the image file to be uploaded.
+        media_filename: Name of the image file within the media folder.
         
         Returns:
         The blob identifier if the upload is successful, or None if an error occurs.
         """
 
-        media_path = f"{config['media_folder']}/{media_filename}"
+        media_path = self._media_path(config, media_filename)
 
-        if not os.path.exists(media_path):
+        # Stat the file in a worker thread so a slow disk doesn't stall the other uploads and posts in flight.
+        try:
+            media_stat = await aiofiles.os.stat(media_path)
+        except OSError:
             print(f"File does not exist: {media_path}")
             return None
         
@@ -148,33 +395,53 @@ class BlueskyPoster:
             mime_type = 'image/jpeg' # Fallback for safety
 
         try:
-            with open(media_path, "rb") as media_file:
-                media_bytes = media_file.read()
-
-            if len(media_bytes) > 1000000:
+            # Check the size before opening the file, so images within the limit can be streamed as-is.
+            media_size = media_stat.st_size
+            if media_size > _MAX_IMAGE_BYTES and Image is None:
                 raise Exception(
-                    f"Image file size too large. 1000000 bytes maximum, got: {len(media_bytes)}"
-                )
-
-            async with aiohttp.ClientSession() as session:
-                resp = await session.post(
-                    # TODO: what is the recipe for uploading videos to Bluesky?
-                    config['pds_url'] + "/xrpc/com.atproto.repo.uploadBlob",
-                    headers={
-                        "Content-Type": mime_type,
-                        "Authorization": "Bearer " + self.access_jwt
-                    },
-                    data=media_bytes,
+                    f"Image file size too large. {_MAX_IMAGE_BYTES} bytes maximum, got: {media_size}"
                 )
-                resp.raise_for_status()
-                blob = (await resp.json())["blob"] 
 
-            return blob
+            # At most four uploads in flight (a post's image limit), even across concurrent posts.
+            async with self._upload_semaphore:
+                if media_size <= _MAX_IMAGE_BYTES:
+                    async with aiofiles.open(media_path, "rb") as media_file:
+                        return await self._upload_blob(config, _iter_file_chunks(media_file), mime_type, media_size)
+
+                # Too large to post as-is, often because of EXIF data: recompress it off the event loop.
+                async with aiofiles.open(media_path, "rb") as media_file:
+                    media_bytes = await media_file.read()
+                media_bytes = await asyncio.to_thread(_shrink_image, media_bytes)
+                print(f"Recompressed {media_filename} from {media_size} to {len(media_bytes)} bytes.")
+                if len(media_bytes) > _MAX_IMAGE_BYTES:
+                    raise Exception(
+                        f"Image file size too large. {_MAX_IMAGE_BYTES} bytes maximum, got: {len(media_bytes)} after recompressing"
+                    )
+                return await self._upload_blob(config, media_bytes, 'image/jpeg', len(media_bytes))
 
         except aiohttp.ClientError as e:  # Catch aiohttp exceptions
             print(f"Error uploading image: {e}")
             return None
 
+    async def _upload_blob(self, config, data, mime_type, size, timeout=None):
+        """
+        Sends media bytes (or an async iterable of chunks) to com.atproto.repo.uploadBlob and returns the blob.
+        `timeout` overrides the session's timeout, for uploads too large to finish within it.
+        """
+        session = await self._get_http()
+        async with session.post(
+            config['pds_url'] + "/xrpc/com.atproto.repo.uploadBlob",
+            headers={
+                "Content-Type": mime_type,
+                "Content-Length": str(size),
+                "Authorization": "Bearer " + self.access_jwt
+            },
+            data=data,
+            timeout=timeout or session.timeout,
+        ) as resp:
+            resp.raise_for_status()
+            return (await resp.json(loads=_json_loads))["blob"]
+
     def manage_bluesky_message_length(self, tweet):
         """
         Manages the length of a Bluesky message to keep it under 300 characters.
@@ -187,17 +454,17 @@ class BlueskyPoster:
         """
 
         # Remove the URL from the tweet
-        tweet['text'] = re.sub(r"https://t\.co/\S+", "", tweet['text']).strip()
-
-        # Create the long and short versions of the addendum
-        long_addendum = f"\n\nTweeted at {tweet['timestamp']} UTC"
-        short_addendum = f"\nTweeted {tweet['timestamp'].split()[0]}"
-
-        # Check if the long addendum fits within the character limit
-        if len(tweet['text'] + long_addendum) <= 300:
-            return tweet['text'] + long_addendum
+        tweet['text'] = _strip_tco_links(tweet['text']).strip()
+
+        # Check if the long addendum ("\n\nTweeted at <timestamp> UTC") fits within the character
+        # limit before building it; otherwise fall back to the short, date-only version.
+        # Plain string math on purpose: don't reach for Numba's @njit here, it has no str/re support.
+        text = tweet['text']
+        timestamp = tweet['timestamp']
+        if len(text) + len(timestamp) + 17 <= 300:
+            return f"{text}\n\nTweeted at {timestamp} UTC"
         else:
-            return tweet['text'] + short_addendum
+            return f"{text}\nTweeted {timestamp.split()[0]}"
 
     async def create_post(self, config, tweet):
         """
@@ -208,7 +475,7 @@ class BlueskyPoster:
             tweet: A dictionary representing the tweet data to be posted.
         
             Returns:
-            None
+            The createRecord response (with the new post's `uri` and `cid`), or None if posting failed.
         """
         bsky_session = await self.get_or_create_session()
         if bsky_session is None:
@@ -217,14 +484,173 @@ class BlueskyPoster:
         #config['accessJwt'] = bsky_session["accessJwt"]
         #config['did'] = bsky_session["did"]
 
+        post = await self._prepare_post(config, tweet)
+        return await self._publish_post(config, tweet, post)
+
+    async def create_posts(self, config, tweets, max_concurrency=8):
+        """
+        Posts a batch of tweets concurrently, with at most `max_concurrency` posts in flight at once.
+
+            Args:
+            config: Configuration dictionary containing necessary session and API details.
+            tweets: A list of tweet dictionaries to be posted.
+            max_concurrency: The maximum number of create_post calls running at the same time.
+
+            Returns:
+            A list of createRecord responses (None for failed posts), in the same order as `tweets`.
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def create_limited(tweet):
+            async with semaphore:
+                return await self.create_post(config, tweet)
+
+        return await asyncio.gather(*(create_limited(tweet) for tweet in tweets))
+
+    async def create_posts_batch(self, config, tweets, batch_size=50):
+        """
+        Posts a batch of tweets through com.atproto.repo.applyWrites, sending up to `batch_size`
+        records per request instead of one createRecord call per tweet.
+
+        Posts are prepared (facets resolved, media uploaded) concurrently, then written in order.
+        Chunks are sent one after another: the PDS serializes writes to a repo anyway, and this keeps
+        the posts in the order given. Quote embeds must refer to posts that already exist.
+
+        applyWrites is all-or-nothing, so a chunk the PDS rejects outright (a 400, e.g. one invalid
+        record) is posted one record at a time instead, and only the bad records fail. A chunk the
+        PDS accepted counts as written even if the response doesn't list every new record, since
+        retrying it would post duplicates.
+
+            Args:
+            config: Configuration dictionary containing necessary session and API details.
+            tweets: A list of tweet dictionaries to be posted.
+            batch_size: The number of records per applyWrites call (the PDS allows up to 200).
+
+            Returns:
+            A list of results with each new post's `uri` and `cid` (None for failed posts), in the same order as `tweets`.
+            A post that was written but left out of the applyWrites response has None for both.
+        """
+        if await self.get_or_create_session() is None:
+            return [None] * len(tweets)
+
+        posts = await asyncio.gather(
+            *(self._prepare_post(config, tweet) for tweet in tweets),
+            return_exceptions=True,
+        )
+        results = [None] * len(tweets)
+        pending = []  # (index, post) for every tweet that was prepared successfully
+        for i, post in enumerate(posts):
+            if isinstance(post, Exception):
+                print(f"Could not prepare Tweet {tweets[i].get('tweet_id')}: {post}")
+            else:
+                pending.append((i, post))
+
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            if await self.get_or_create_session() is None:
+                break
+            try:
+                write_results = await self._apply_writes(config, [post for _, post in chunk])
+            except aiohttp.ClientResponseError as e:
+                if e.status != 400:
+                    print(f"Error applying {len(chunk)} writes: {e}")
+                    continue
+                print(f"applyWrites rejected {len(chunk)} writes ({e.message}). Posting them one at a time...")
+                for i, post in chunk:
+                    results[i] = await self._publish_post(config, tweets[i], post)
+                continue
+            except aiohttp.ClientError as e:
+                print(f"Error applying {len(chunk)} writes: {e}")
+                continue
+            except asyncio.TimeoutError:
+                print(f"Applying {len(chunk)} writes timed out.")
+                continue
+
+            if len(write_results) != len(chunk):
+                # `results` is optional in the applyWrites output. The writes were committed all the
+                # same, so they are recorded as done, just without their URIs.
+                print(f"applyWrites returned {len(write_results)} results for {len(chunk)} writes. Treating all as written.")
+                write_results = [{}] * len(chunk)
+            for (i, _), write_result in zip(chunk, write_results):
+                results[i] = {"uri": write_result.get("uri"), "cid": write_result.get("cid")}
+                tweet_id = tweets[i].get('tweet_id')
+                if tweet_id:
+                    self._built_posts.pop(tweet_id, None)
+
+        return results
+
+    async def _apply_writes(self, config, posts):
+        """
+        Creates several post records in one com.atproto.repo.applyWrites call.
+
+        Returns:
+            The per-record results (each with `uri` and `cid`). The list is empty if the PDS left them out.
+
+        Raises:
+            aiohttp.ClientResponseError: If the PDS rejects the request. No records were written.
+        """
+        writes = [
+            {
+                "$type": "com.atproto.repo.applyWrites#create",
+                "collection": "app.bsky.feed.post",
+                "value": post,
+            }
+            for post in posts
+        ]
+        session = await self._get_http()
+        async with session.post(
+            config['pds_url'] + "/xrpc/com.atproto.repo.applyWrites",
+            headers={**_JSON_CONTENT_TYPE, "Authorization": "Bearer " + self.access_jwt},
+            data=_json_body({
+                "repo": self.did,
+                "writes": writes,
+            }),
+        ) as resp:
+            resp.raise_for_status()
+            response_json = await resp.json(loads=_json_loads)
+            return response_json.get("results") or []
+
+    async def _prepare_post(self, config, tweet):
+        """
+        Returns the post record for a tweet, building it only if an earlier attempt hasn't already.
+        """
+        # Reuse the record built by an earlier, failed attempt at this tweet, so a retry doesn't
+        # re-resolve handles, re-upload media, or append the addendum to the text a second time.
+        tweet_id = tweet.get('tweet_id')
+        post = self._built_posts.get(tweet_id) if tweet_id else None
+        if post is None:
+            post = await self._build_post(config, tweet)
+            if tweet_id:
+                self._built_posts[tweet_id] = post
+        return post
+
+    async def _publish_post(self, config, tweet, post):
+        """
+        Submits a prepared post record, forgetting the cached record once it has been posted.
+        """
+        response_json = await self._submit_post(config, post)
+        tweet_id = tweet.get('tweet_id')
+        if response_json is not None and tweet_id:
+            self._built_posts.pop(tweet_id, None)
+        return response_json
+
+    async def _build_post(self, config, tweet):
+        """
+        Builds the app.bsky.feed.post record for a tweet: the length-managed text, its facets, and any media or quote embed.
+        """
         tweet['text' ]= self.manage_bluesky_message_length(tweet)
 
-        # trailing "Z" is preferred over "+00:00"
-        now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        now = datetime.now(timezone.utc).strftime(_CREATED_AT_FORMAT)
 
         # Use the parse_facets function to generate facets
         #facets = parse_facets(tweet['text'] + addendum, self.pds_url)
-        facets = parse_facets(tweet['text'], self.pds_url)
+        # Pure-text tweets (no mention, hashtag, or link markers) can't have facets, so skip the call.
+        text = tweet['text']
+        if "@" in text or "#" in text or "http" in text:
+            session = await self._get_http()
+            facets = await parse_facets(text, self.pds_url, session, self._did_cache)
+        else:
+            facets = []
 
         # these are the required fields which every post must include
         post = {
@@ -253,9 +679,16 @@ class BlueskyPoster:
                 "$type": "app.bsky.embed.images",
                 "images": []
             }
-            for media_filename in tweet['media_filenames']:
-                blob = await self.upload_image(config, media_filename)
-                if blob:
+            # Upload all of the post's images concurrently; gather keeps them in tweet order.
+            # An image that fails (e.g. one that is too large) is left out rather than failing the whole post.
+            blobs = await asyncio.gather(
+                *(self.upload_image(config, media_filename) for media_filename in tweet['media_filenames']),
+                return_exceptions=True,
+            )
+            for media_filename, blob in zip(tweet['media_filenames'], blobs):
+                if isinstance(blob, Exception):
+                    print(f"Skipping image {media_filename}: {blob}")
+                elif blob:
                     image_setting = {"alt": '', "image": blob}
                     image_embed["images"].append(image_setting)
             
@@ -278,25 +711,35 @@ class BlueskyPoster:
         if embed:
             post["embed"] = embed
 
-        print("Final post object being sent:")
-        print(json.dumps(post, indent=2), file=sys.stderr)
+        return post
+
+    async def _submit_post(self, config, post):
+        """
+        Sends a built post record to com.atproto.repo.createRecord.
+
+        Returns:
+            The createRecord response, or None if the request failed.
+        """
+        # Pretty-printing is only worth paying for when someone has turned on debug logging.
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final post object being sent:\n%s", _json_dumps(post, indent=True))
 
         try:
-            async with aiohttp.ClientSession() as session:
-                resp = await session.post(
-                    config['pds_url'] + "/xrpc/com.atproto.repo.createRecord",
-                    headers={"Authorization": "Bearer " + self.access_jwt},
-                    json={
-                        "repo": self.did,
-                        "collection": "app.bsky.feed.post",
-                        "record": post,
-                    },
-                )
-                print("createRecord response:", file=sys.stderr)
+            session = await self._get_http()
+            async with session.post(
+                config['pds_url'] + "/xrpc/com.atproto.repo.createRecord",
+                headers={**_JSON_CONTENT_TYPE, "Authorization": "Bearer " + self.access_jwt},
+                data=_json_body({
+                    "repo": self.did,
+                    "collection": "app.bsky.feed.post",
+                    "record": post,
+                }),
+            ) as resp:
                 resp.raise_for_status() # Check for HTTP errors
                 
-                response_json = await resp.json()
-                print(json.dumps(response_json, indent=2))
+                response_json = await resp.json(loads=_json_loads)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("createRecord response:\n%s", _json_dumps(response_json, indent=True))
                 
                 # --- CRITICAL CHANGE: RETURN THE RESPONSE ---
                 return response_json
@@ -330,6 +773,7 @@ async def main():
     config['pds_url'] = BLUESKY_PDS_URL
     config['media_folder'] = str(script_dir / TWITTER_DATA_ROOT_FOLDER / 'tweets_media')
     config['tweet_objects_file'] = str(script_dir / TWITTER_DATA_ROOT_FOLDER / 'tweets.js')
+    config['concurrency'] = int(os.getenv("POST_CONCURRENCY", 4))
         
     if not (config['handle'] and config['password']):
         print("both handle and password are required", file=sys.stderr)
@@ -339,7 +783,7 @@ async def main():
         sys.exit(-1) """
         
     # Create an instance of BlueskyPoster
-    bluesky_poster = BlueskyPoster(config['pds_url'], config['handle'], config['password'])  # Assuming the constructor takes these arguments
+    bluesky_poster = BlueskyPoster(config['pds_url'], config['handle'], config['password'], config['media_folder'])  # Assuming the constructor takes these arguments
         
     # Create TweetParser instance. 
     twitter_parser = TweetArchiveParser(config['tweet_objects_file'])
@@ -350,31 +794,27 @@ async def main():
     tweets = []
     tweets = twitter_parser.extract_metadata(tweets_raw)
 
-    # TODO: need a Tweet to post. Pick one to test with. 
+    # TODO: need Tweets to post. Pick some to test with. 
     #tweet = tweets[188]
-    # tweet_id = '1662845607046795264' OK
-    # tweet_id = '1217911688827211777' OK
-    # tweet_id = '928009601601167366'
-    tweet_id = '985872580350390279' #Video post
-    # tweet_id = '981638312241725440' #quotes post 981630390937960448
-    # tweet_id = '902302003812065281' #self-quotes post 902301386880286721
-
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for item in tweets:
-            # ... (prepare config and tweet_data)
-            if item['tweet_id'] == tweet_id:
-                tweet = item
-                break
-
-        task = asyncio.create_task(
-            #poster.create_post_async(config, tweet, httpsession)  # Pass the session
-            bluesky_poster.create_post(config, tweet)  # Pass the session
-        )
-        tasks.append(task)
-        await asyncio.sleep(3.6)  # Adjust delay as needed
-
-        await asyncio.gather(*tasks)
+    tweet_ids = [
+        # '1662845607046795264', # OK
+        # '1217911688827211777', # OK
+        # '928009601601167366',
+        '985872580350390279', #Video post
+        # '981638312241725440', #quotes post 981630390937960448
+        # '902302003812065281', #self-quotes post 902301386880286721
+    ]
+
+    tweets_by_id = {item['tweet_id']: item for item in tweets}
+    tweets_to_post = [tweets_by_id[tweet_id] for tweet_id in tweet_ids if tweet_id in tweets_by_id]
+    if not tweets_to_post:
+        print(f"None of the Tweet IDs {tweet_ids} were found in the archive.", file=sys.stderr)
+        return
+
+    try:
+        await bluesky_poster.create_posts(config, tweets_to_post, max_concurrency=config['concurrency'])
+    finally:
+        await bluesky_poster.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
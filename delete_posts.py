@@ -1,10 +1,118 @@
 import asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import os
 import argparse
 from dotenv import load_dotenv
 from atproto import AsyncClient
 
+# How many delete requests may be in flight at once.
+DELETE_CONCURRENCY = 10
+
+# The most writes com.atproto.repo.applyWrites accepts in one request.
+APPLY_WRITES_BATCH_SIZE = 200
+
+# Alphabet of the base32-sortable encoding used for TID record keys.
+_TID_ALPHABET = "234567abcdefghijklmnopqrstuvwxyz"
+
+# Allowance for a client clock that ran ahead when it wrote a post's createdAt.
+_CREATED_AT_CLOCK_SKEW = timedelta(minutes=5)
+
+def tid_timestamp(rkey):
+    """
+    Returns the time encoded in a TID record key as a UTC datetime, or None if the key is not a TID.
+
+    A TID holds the microseconds since the epoch in its top bits, set when the record was written.
+    Unlike a post's createdAt, which importers backdate, TIDs only go up, and listRecords is ordered by them.
+    """
+    if len(rkey) != 13:
+        return None
+    value = 0
+    for char in rkey:
+        digit = _TID_ALPHABET.find(char)
+        if digit < 0:
+            return None
+        value = (value << 5) | digit
+    return datetime.fromtimestamp((value >> 10) / 1_000_000, tz=timezone.utc)
+
+async def find_posts_to_delete(client, did, start_time_utc, end_time_utc, match_string=None, verbose=False):
+    """
+    Pages through the account's posts and returns those created within the window (and containing match_string, if given).
+
+    Args:
+        client: A logged-in atproto AsyncClient.
+        did: The DID of the account whose posts are scanned.
+        start_time_utc: The start of the window, as an aware UTC datetime.
+        end_time_utc: The end of the window, as an aware UTC datetime.
+        match_string: Optional text a post must contain.
+        verbose: Print the time of every post scanned.
+
+    Returns:
+        A list of dicts with each post's 'uri', 'rkey', and the start of its 'text'.
+    """
+    posts_to_delete = []
+    cursor = None
+    post_count = 0
+    # A post written (per its TID) before this can't carry an in-window createdAt.
+    written_before_window = start_time_utc - _CREATED_AT_CLOCK_SKEW
+
+    while True:
+        try:
+            response = await client.com.atproto.repo.list_records({
+                'repo': did,
+                'collection': 'app.bsky.feed.post',
+                'limit': 100,
+                'cursor': cursor
+            })
+
+            if not response.records:
+                break 
+
+            post_count += len(response.records)
+            print(f"  Scanned {post_count} posts...", end='\r')
+
+            # listRecords pages run newest to oldest by record key. Once a whole page was written before the
+            # window, every later page was too, so there is no need to fetch the rest of the repo. This goes by
+            # the TID in the key, not createdAt: imported posts are backdated, so createdAt is out of order.
+            page_is_before_window = True
+
+            for record in response.records:
+                uri = record.uri
+                rkey = uri.rpartition('/')[2]
+                written_at = tid_timestamp(rkey)
+                if written_at is None or written_at >= written_before_window:
+                    page_is_before_window = False
+
+                post = record.value
+                post_time_str = post.created_at
+                if not post_time_str:
+                    continue
+                
+                post_time = datetime.fromisoformat(post_time_str.replace('Z', '+00:00'))
+                if verbose:
+                    print(f"  > Scanning post from: {post_time.isoformat()}")
+
+                # Primary filter: time window
+                if start_time_utc <= post_time <= end_time_utc:
+                    post_text = post.text or ""
+                    
+                    # Secondary (optional) filter: text content
+                    if not match_string or match_string in post_text:
+                        posts_to_delete.append({
+                            'uri': uri,
+                            'rkey': rkey,
+                            'text': post_text[:75]
+                        })
+
+            cursor = response.cursor
+            if not cursor or page_is_before_window:
+                break 
+
+        except Exception as e:
+            print(f"\nAn error occurred while fetching posts: {e}")
+            break
+
+    return posts_to_delete
+
 async def main():
     """
     Main function to connect to Bluesky, find posts within a specified
@@ -23,6 +131,8 @@ async def main():
                         help='(Optional) Only delete posts that also contain this text.')
     parser.add_argument('--dry-run', action='store_true',
                         help='List the posts that would be deleted without actually deleting them.')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print the time of every post scanned, not just a running count.')
     args = parser.parse_args()
 
     # --- Load Configuration from .env file ---
@@ -64,64 +174,9 @@ async def main():
     # --- Fetch and Filter Posts ---
     print(f"\nFetching posts between {start_time_utc.isoformat()} and {end_time_utc.isoformat()}...")
     
-    posts_to_delete = []
-    cursor = None
-    post_count = 0
-    
-    while True:
-        try:
-            response = await client.com.atproto.repo.list_records({
-                'repo': profile.did,
-                'collection': 'app.bsky.feed.post',
-                'limit': 100,
-                'cursor': cursor
-            })
-
-            if not response.records:
-                break 
-
-            post_count += len(response.records)
-            print(f"  Scanned {post_count} posts...", end='\r')
-
-            for record in response.records:
-                post_text = record.value.text
-                post_time_str = record.value.created_at
-                if not post_time_str:
-                    continue
-                
-                post_time = datetime.fromisoformat(post_time_str.replace('Z', '+00:00'))
-
-                print(f"  > Scanning post from: {post_time.isoformat()}")
-
-                # Primary filter: time window
-                if start_time_utc <= post_time <= end_time_utc:
-                    post_text = record.value.text or ""
-                    
-                    # Secondary (optional) filter: text content
-                    if args.match_string:
-                        if args.match_string in post_text:
-                            # Both filters match, add to list
-                            posts_to_delete.append({
-                                'uri': record.uri,
-                                'rkey': record.uri.split('/')[-1],
-                                'text': post_text[:75]
-                            })
-                    else:
-                        # Only time filter was needed, add to list
-                        posts_to_delete.append({
-                            'uri': record.uri,
-                            'rkey': record.uri.split('/')[-1],
-                            'text': post_text[:75]
-                        })
-
-            cursor = response.cursor
-            if not cursor:
-                break 
-
-        except Exception as e:
-            print(f"\nAn error occurred while fetching posts: {e}")
-            break
-
+    posts_to_delete = await find_posts_to_delete(
+        client, profile.did, start_time_utc, end_time_utc, args.match_string, verbose=args.verbose
+    )
 
     # --- Confirmation and Deletion ---
     if not posts_to_delete:
@@ -147,16 +202,44 @@ async def main():
         return
 
     print("\nDeleting posts...")
-    for post in posts_to_delete:
+    semaphore = asyncio.Semaphore(DELETE_CONCURRENCY)
+
+    async def delete_post(post):
+        # Only used when a batch fails. Deletes are independent, so several run at once.
+        async with semaphore:
+            try:
+                await client.com.atproto.repo.delete_record({
+                    'repo': profile.did,
+                    'collection': 'app.bsky.feed.post',
+                    'rkey': post['rkey']
+                })
+                print(f"  ✅ DELETED: {post['uri']}")
+            except Exception as e:
+                print(f"  ❌ FAILED to delete {post['uri']}: {e}")
+
+    async def delete_batch(batch):
+        # One applyWrites request deletes the whole batch in a single repo commit.
         try:
-            await client.com.atproto.repo.delete_record({
+            await client.com.atproto.repo.apply_writes({
                 'repo': profile.did,
-                'collection': 'app.bsky.feed.post',
-                'rkey': post['rkey']
+                'writes': [
+                    {
+                        '$type': 'com.atproto.repo.applyWrites#delete',
+                        'collection': 'app.bsky.feed.post',
+                        'rkey': post['rkey']
+                    }
+                    for post in batch
+                ]
             })
-            print(f"  ✅ DELETED: {post['uri']}")
+            for post in batch:
+                print(f"  ✅ DELETED: {post['uri']}")
         except Exception as e:
-            print(f"  ❌ FAILED to delete {post['uri']}: {e}")
+            # applyWrites is all-or-nothing, so one bad record fails the whole batch. Retry them one by one.
+            print(f"  Batch delete of {len(batch)} posts failed ({e}). Deleting them one at a time...")
+            await asyncio.gather(*(delete_post(post) for post in batch))
+
+    for start in range(0, len(posts_to_delete), APPLY_WRITES_BATCH_SIZE):
+        await delete_batch(posts_to_delete[start:start + APPLY_WRITES_BATCH_SIZE])
 
     print("\nDeletion process complete.")
 
@@ -1,4 +1,5 @@
-from tweet_archive_parser import TweetArchiveParser
+from tweet_archive_parser import TweetArchiveParser, created_at_sort_key
+from operator import itemgetter
 from bluesky_poster import BlueskyPoster
 import asyncio
 import aiohttp
@@ -10,6 +11,27 @@ import argparse # Added for command-line arguments
 
 LAST_PROCESSED_TIMESTAMP_FILE = "last_processed_timestamp.txt"
 
+class RateLimiter:
+    """
+    Spaces out calls to wait() so they return at most once per interval.
+
+    Each call reserves the next free slot rather than sleeping a fixed amount, so time spent between
+    calls counts toward the interval, and the first call returns immediately.
+    """
+    def __init__(self, interval_seconds):
+        self._interval = interval_seconds
+        self._next_slot = None
+
+    async def wait(self):
+        """Waits until the next free slot."""
+        now = asyncio.get_running_loop().time()
+        if self._next_slot is None or self._next_slot < now:
+            self._next_slot = now
+        delay = self._next_slot - now
+        self._next_slot += self._interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
 def load_last_processed_timestamp():
 
     """Loads the last processed timestamp from file, or returns None if not found."""
@@ -20,11 +42,28 @@ def load_last_processed_timestamp():
     except FileNotFoundError:
         return None
 
+# The newest timestamp saved during this run.
+_last_saved_timestamp = None
+
 def save_last_processed_timestamp(timestamp):
 
-    """Saves the last processed timestamp to file."""
-    with open(LAST_PROCESSED_TIMESTAMP_FILE, "w") as f:
-        f.write(timestamp.strftime('%Y-%m-%d %H:%M:%S'))
+    """
+    Saves the last processed timestamp, a UTC 'YYYY-MM-DD HH:MM:SS' string, to file.
+    That is the format tweet timestamps already come in, and such strings compare in time order.
+
+    Posts run concurrently and can finish out of order, so a timestamp no newer than one already saved
+    this run is skipped: it would move the resume point backwards and costs a file write for nothing.
+    The file is replaced atomically, so a crash mid-write can't leave it empty or truncated.
+    """
+    global _last_saved_timestamp
+    if _last_saved_timestamp is not None and timestamp <= _last_saved_timestamp:
+        return
+
+    temp_file = LAST_PROCESSED_TIMESTAMP_FILE + ".tmp"
+    with open(temp_file, "w") as f:
+        f.write(timestamp)
+    os.replace(temp_file, LAST_PROCESSED_TIMESTAMP_FILE)
+    _last_saved_timestamp = timestamp
 
 async def create_post(config, tweet, bluesky_poster, save_timestamp_on_success=True):
     """
@@ -54,7 +93,7 @@ async def create_post(config, tweet, bluesky_poster, save_timestamp_on_success=T
         
         # 2. Check if the post was successful and build the new detailed message
         if final_post_record:
-            post_url = f"https://bsky.app/profile/{config['handle']}/post/{final_post_record.get('uri', '').split('/')[-1]}"
+            post_url = f"https://bsky.app/profile/{config['handle']}/post/{final_post_record.get('uri', '').rpartition('/')[2]}"
             text_snippet = tweet.get('text', '').split('\n')[0][:75]
             
             message = f"✅ SUCCESS: Posted \"{text_snippet}...\""
@@ -74,8 +113,8 @@ async def create_post(config, tweet, bluesky_poster, save_timestamp_on_success=T
 
         # 3. The decision to save the timestamp now also depends on a successful post
         if save_timestamp_on_success and final_post_record:
-            ts_to_save = datetime.strptime(tweet['timestamp'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-            save_last_processed_timestamp(ts_to_save)
+            # The tweet's timestamp is already in the file's format, so it is saved without a parse/format round trip.
+            save_last_processed_timestamp(tweet['timestamp'])
 
 
 
@@ -98,7 +137,7 @@ async def main():
     parser.add_argument('--reprocess-videos', action='store_true',
                        help='Reprocess all video tweets from the beginning.')
     parser.add_argument('--dry-run', action='store_true',
-                       help='Simulate the posting process without creating actual posts.\nSets interval to 1 second and does not save last processed time.')
+                       help='Simulate the posting process without creating actual posts.\nDoes not wait between tweets and does not save last processed time.')
     args = parser.parse_args()
 
     # --- Argument Validation ---
@@ -122,9 +161,8 @@ async def main():
     if args.dry_run:
         print("="*50)
         print("===      DRY RUN MODE ACTIVATED      ===")
-        print("=== No posts will be made or saved. Setting interval to 1 second. ===")
+        print("=== No posts will be made or saved, and there is no wait between tweets. ===")
         print("="*50)
-        config['sleep_interval_seconds'] = 1.0
 
     # if not config['handle'] or not config['password'] or not config['pds_url']:
     if not all(config[k] for k in ['handle', 'password', 'pds_url']):
@@ -133,40 +171,19 @@ async def main():
     # -------------------------------------------  
     # --- Instance Initialization ---------------
     tweet_parser = TweetArchiveParser(config['tweet_objects_file'])
-    bluesky_poster = BlueskyPoster(pds_url=config['pds_url'], handle=config['handle'], password=config['password'])
+    bluesky_poster = BlueskyPoster(pds_url=config['pds_url'], handle=config['handle'], password=config['password'], media_folder=config['media_folder'])
 
     # -------------------------------------------  
-    # --- Tweet Loading and Preparation ---------
-    
-    # Load a collection of Tweets loaded from a downloaded Twitter account archives, populate tweets[].
-    print("Loading and parsing Twitter archive...")
-    tweets_raw = tweet_parser.load_twitter_archive()
-    # Previously:
-    # tweets = tweet_parser.load_twitter_archive(config['tweet_objects_file'])
-
-    # Let's sort it!
-    tweets_sorted = sorted(tweets_raw, key=lambda tweet: datetime.strptime(tweet["created_at"], "%a %b %d %H:%M:%S +0000 %Y"))
-    # Previously:
-    # tweets.sort(key=lambda tweet: datetime.strptime(tweet["created_at"], "%a %b %d %H:%M:%S +0000 %Y")) 
-    
-    tweets_filtered = tweet_parser.filter_out_replies(tweets_sorted)
-    tweets = tweet_parser.extract_metadata(tweets_filtered)
-
-    # Generate a set of statistics and time-series data from the Tweet collection. 
-    print(f"Loaded {len(tweets)} tweets to potentially process.")
-    print(f"{tweet_parser.get_stats(tweets)}")
-
-    # -------------------------------------------  
-    # --- Mode Selection and Filtering ----------
+    # --- Mode Selection ------------------------
+    # The resume point is settled before the archive is loaded, so tweets before it can be
+    # dropped straight away instead of being sorted and parsed only to be thrown out.
 
     last_processed_timestamp = None
     save_on_post = True
 
     if args.reprocess_videos:
         print("--- Mode: Reprocessing all videos ---")
-        tweets = [t for t in tweets if t.get('media_type') in ['video', 'gif']]
         save_on_post = False  # Do not update the timestamp file in this mode
-        print(f"Found {len(tweets)} video tweets to process.")
     elif args.start_from:
         try:
             start_dt_naive = datetime.strptime(args.start_from, '%Y-%m-%d %H:%M:%S')
@@ -186,47 +203,96 @@ async def main():
         print("--- Mode: Resuming from last saved post ---")
         last_processed_timestamp = load_last_processed_timestamp()
 
+    # -------------------------------------------  
+    # --- Tweet Loading and Preparation ---------
+    
+    # Load a collection of Tweets loaded from a downloaded Twitter account archives, populate tweets[].
+    # Tweets are streamed through the cutoff filter into extract_metadata, so only the ones kept are held in memory.
+    print("Loading and parsing Twitter archive...")
+    tweets_raw = tweet_parser.iter_twitter_archive()
+    # Previously:
+    # tweets = tweet_parser.load_twitter_archive(config['tweet_objects_file'])
+
     if last_processed_timestamp:
         print(f"Filtering tweets after: {last_processed_timestamp}")
-        tweets = [t for t in tweets if datetime.strptime(t['timestamp'], '%Y-%m-%d %H:%M:%S') > last_processed_timestamp]
-        print(f"Found {len(tweets)} new tweets to process.")
+        # Compare (year, month, day, 'HH:MM:SS') keys, so no tweet's created_at needs a full parse.
+        if last_processed_timestamp.tzinfo is not None:
+            last_processed_timestamp = last_processed_timestamp.astimezone(timezone.utc)
+        cutoff = (
+            last_processed_timestamp.year,
+            last_processed_timestamp.month,
+            last_processed_timestamp.day,
+            last_processed_timestamp.strftime('%H:%M:%S'),
+        )
+        tweets_raw = (t for t in tweets_raw if created_at_sort_key(t["created_at"]) > cutoff)
     else:
         # This branch will now also be hit if --start-from isn't used and no save file exists
         print("No saved or specified start time. Processing from the beginning of the archive.")
 
+    # Drop replies while extracting, so each tweet is visited once and only the kept ones are sorted.
+    # A corrupt archive stops the run here, before anything is posted or the saved timestamp moves on.
+    try:
+        tweets = tweet_parser.extract_metadata(tweets_raw, skip_replies=True)
+    except ValueError as e:
+        print(e)
+        print("Nothing was posted.")
+        return
+
+    # Let's sort it! The extracted 'YYYY-MM-DD HH:MM:SS' timestamps sort chronologically as plain strings,
+    # so the sort reuses them instead of taking created_at apart again.
+    tweets.sort(key=itemgetter("timestamp"))
+
+    if args.reprocess_videos:
+        tweets = [t for t in tweets if t.get('media_type') in ['video', 'gif']]
+        print(f"Found {len(tweets)} video tweets to process.")
+    elif last_processed_timestamp:
+        print(f"Found {len(tweets)} new tweets to process.")
+
     # --- Main Processing Loop ---
     if not tweets:
         print("No new tweets to post.")
         return
+
+    # Generate a set of statistics and time-series data from the Tweet collection. 
+    print(f"Loaded {len(tweets)} tweets to potentially process.")
+    print(f"{tweet_parser.get_stats(tweets)}")
         
     # --- Main Processing Loop (Restored to staggered parallel execution) ---
     print(f"\nStarting post sequence. Staggering post starts by {config['sleep_interval_seconds']} seconds.")
     
-    tasks = []
-    for tweet in tweets:
-        tweet_url = f"https://twitter.com/i/status/{tweet['tweet_id']}"
-        print(f"Processing Tweet ID: {tweet['tweet_id']} from {tweet['timestamp']} UTC (Original: {tweet_url})")
-        
+    limiter = RateLimiter(config['sleep_interval_seconds'])
+    try:
+        # Only posts still in flight are kept. Each task removes itself once done, so a long run
+        # doesn't hold on to a finished task for every tweet in the archive.
+        tasks = set()
+        for tweet in tweets:
+            if not args.dry_run:
+                # Wait for this post's slot, which creates the stagger effect between post starts.
+                # This comes before the log line, so it is printed as the post actually starts.
+                await limiter.wait()
+
+            tweet_url = f"https://twitter.com/i/status/{tweet['tweet_id']}"
+            print(f"Processing Tweet ID: {tweet['tweet_id']} from {tweet['timestamp']} UTC (Original: {tweet_url})")
         
-        if args.dry_run:
-            # In dry-run mode, we print the simulation and do nothing else.
-            print(f"-> DRY RUN: Would post Tweet with text: \"{tweet['text'][:75]}...\"")
-            if tweet.get('media_type'):
-                print(f"-> DRY RUN: with {tweet['media_type']}: {tweet['media_filenames']}")
-        else:
-            # In a real run, we create the background task for posting.
-            task = asyncio.create_task(
-                create_post(config, tweet, bluesky_poster, save_timestamp_on_success=save_on_post)
-            )
-            tasks.append(task)
         
-        # Wait for the specified interval before starting the next post task
-        # This creates the stagger effect.
-        await asyncio.sleep(config['sleep_interval_seconds'])
-
-    # After starting all tasks with delays, wait here until they are all completed.
-    print("\nAll posts have been queued. Waiting for any remaining uploads to complete...")
-    await asyncio.gather(*tasks)
+            if args.dry_run:
+                # In dry-run mode, we print the simulation and do nothing else.
+                print(f"-> DRY RUN: Would post Tweet with text: \"{tweet['text'][:75]}...\"")
+                if tweet.get('media_type'):
+                    print(f"-> DRY RUN: with {tweet['media_type']}: {tweet['media_filenames']}")
+            else:
+                # In a real run, we create the background task for posting.
+                task = asyncio.create_task(
+                    create_post(config, tweet, bluesky_poster, save_timestamp_on_success=save_on_post)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        # After starting all tasks with delays, wait here until they are all completed.
+        print("\nAll posts have been queued. Waiting for any remaining uploads to complete...")
+        await asyncio.gather(*tasks)
+    finally:
+        await bluesky_poster.close()
 
     print("\nScript finished.")
 
@@ -0,0 +1,73 @@
+import sys
+import unittest
+from pathlib import Path
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bluesky_facets import parse_spans, resolve_handle
+
+
+class ParseSpansTest(unittest.TestCase):
+    def test_link_right_after_hash_is_kept(self):
+        spans = parse_spans("see #https://example.com/x".encode("UTF-8"))
+        self.assertEqual(spans, [
+            {"kind": "tag", "start": 4, "end": 10, "tag": "https"},
+            {"kind": "url", "start": 5, "end": 26, "url": "https://example.com/x"},
+        ])
+
+    def test_spans_are_in_text_order(self):
+        spans = parse_spans("hi @a.bsky.social https://x.com/y #tag".encode("UTF-8"))
+        self.assertEqual([span["kind"] for span in spans], ["mention", "url", "tag"])
+
+
+class ResolveHandleTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.responses = []
+
+        async def handler(request):
+            status, body = self.responses.pop(0)
+            return web.json_response(body, status=status)
+
+        app = web.Application()
+        app.router.add_get("/xrpc/com.atproto.identity.resolveHandle", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.pds_url = f"http://127.0.0.1:{port}"
+        self.session = aiohttp.ClientSession()
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.runner.cleanup()
+
+    async def test_server_error_is_not_cached(self):
+        self.responses = [
+            (500, {"error": "InternalServerError"}),
+            (200, {"did": "did:plc:abc"}),
+        ]
+        did_cache = {}
+
+        with self.assertRaises(aiohttp.ClientResponseError):
+            await resolve_handle(self.session, self.pds_url, "alice.bsky.social", did_cache)
+        self.assertNotIn("alice.bsky.social", did_cache)
+
+        did = await resolve_handle(self.session, self.pds_url, "alice.bsky.social", did_cache)
+        self.assertEqual(did, "did:plc:abc")
+        self.assertEqual(did_cache["alice.bsky.social"], "did:plc:abc")
+
+    async def test_unknown_handle_is_cached(self):
+        self.responses = [(400, {"error": "InvalidRequest"})]
+        did_cache = {}
+
+        self.assertIsNone(await resolve_handle(self.session, self.pds_url, "nobody.bsky.social", did_cache))
+        # Served from the cache; a second request would find no response queued.
+        self.assertIsNone(await resolve_handle(self.session, self.pds_url, "nobody.bsky.social", did_cache))
+
+
+if __name__ == "__main__":
+    unittest.main()
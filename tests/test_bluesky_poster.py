@@ -0,0 +1,125 @@
+import sys
+import unittest
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bluesky_poster import BlueskyPoster
+
+
+def tweet(tweet_id, text="hello"):
+    return {"tweet_id": tweet_id, "text": text, "timestamp": "2020-01-01 00:00:00"}
+
+
+class PosterTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs a BlueskyPoster, already logged in, against a local stand-in for the PDS."""
+
+    async def asyncSetUp(self):
+        self.create_record_statuses = []
+        self.created = []
+
+        async def create_record(request):
+            body = await request.json()
+            status = self.create_record_statuses.pop(0) if self.create_record_statuses else 200
+            if status != 200:
+                return web.json_response({"error": "InternalServerError"}, status=status)
+            self.created.append(body["record"]["text"])
+            n = len(self.created)
+            return web.json_response({"uri": f"at://did:plc:me/app.bsky.feed.post/{n}", "cid": f"cid{n}"})
+
+        app = web.Application()
+        app.router.add_post("/xrpc/com.atproto.repo.createRecord", create_record)
+        self.add_routes(app)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.config = {"pds_url": f"http://127.0.0.1:{port}"}
+
+        self.poster = BlueskyPoster(self.config["pds_url"], "me.bsky.social", "password")
+        self.poster.session = {"accessJwt": "access", "did": "did:plc:me"}
+        self.poster.access_jwt = "access"
+        self.poster.did = "did:plc:me"
+
+    def add_routes(self, app):
+        pass
+
+    async def asyncTearDown(self):
+        await self.poster.close()
+        await self.runner.cleanup()
+
+
+class CreatePostTest(PosterTestCase):
+    async def test_failed_publish_keeps_the_prepared_post_for_a_retry(self):
+        self.create_record_statuses = [500]
+        t = tweet("1")
+
+        self.assertIsNone(await self.poster.create_post(self.config, t))
+        self.assertIn("1", self.poster._built_posts)
+
+        result = await self.poster.create_post(self.config, t)
+        self.assertEqual(result["cid"], "cid1")
+        self.assertNotIn("1", self.poster._built_posts)
+        # The retry sent the record built the first time, so the addendum was added only once.
+        self.assertEqual(self.created, ["hello\n\nTweeted at 2020-01-01 00:00:00 UTC"])
+
+
+class CreatePostsBatchTest(PosterTestCase):
+    def add_routes(self, app):
+        self.apply_writes_responses = []
+        self.apply_writes_calls = []
+
+        async def apply_writes(request):
+            body = await request.json()
+            self.apply_writes_calls.append([write["value"]["text"] for write in body["writes"]])
+            status, response = self.apply_writes_responses.pop(0)
+            if response is None:
+                # Stand in for a real commit that returns its results.
+                response = {"results": [
+                    {"uri": f"at://did:plc:me/app.bsky.feed.post/b{i}", "cid": f"b{i}"}
+                    for i in range(len(body["writes"]))
+                ]}
+            return web.json_response(response, status=status)
+
+        app.router.add_post("/xrpc/com.atproto.repo.applyWrites", apply_writes)
+
+    async def test_success(self):
+        self.apply_writes_responses = [(200, None), (200, None)]
+        tweets = [tweet(str(i), text=f"t{i}") for i in range(3)]
+
+        results = await self.poster.create_posts_batch(self.config, tweets, batch_size=2)
+
+        self.assertEqual([r["cid"] for r in results], ["b0", "b1", "b0"])
+        self.assertEqual([len(call) for call in self.apply_writes_calls], [2, 1])
+        self.assertEqual(self.poster._built_posts, {})
+
+    async def test_missing_results_counts_as_written(self):
+        self.apply_writes_responses = [(200, {"commit": {"cid": "c", "rev": "r"}})]
+        tweets = [tweet("1"), tweet("2")]
+
+        results = await self.poster.create_posts_batch(self.config, tweets)
+
+        self.assertEqual(results, [{"uri": None, "cid": None}] * 2)
+        # Nothing is left cached, so a retry can't post these a second time.
+        self.assertEqual(self.poster._built_posts, {})
+        self.assertEqual(self.created, [])
+
+    async def test_rejected_batch_falls_back_to_single_posts(self):
+        self.apply_writes_responses = [(400, {"error": "InvalidRequest"})]
+        self.create_record_statuses = [200, 500, 200]
+        tweets = [tweet(str(i), text=f"t{i}") for i in range(3)]
+
+        results = await self.poster.create_posts_batch(self.config, tweets)
+
+        self.assertEqual(results[0]["cid"], "cid1")
+        self.assertIsNone(results[1])
+        self.assertEqual(results[2]["cid"], "cid2")
+        # Only the record that failed on its own is kept for a retry.
+        self.assertEqual(list(self.poster._built_posts), ["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
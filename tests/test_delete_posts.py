@@ -0,0 +1,74 @@
+import sys
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from delete_posts import _TID_ALPHABET, find_posts_to_delete, tid_timestamp
+
+
+def make_tid(when):
+    value = int(when.timestamp() * 1_000_000) << 10
+    return "".join(_TID_ALPHABET[(value >> shift) & 31] for shift in range(60, -1, -5))
+
+
+def record(written_at, created_at, text="post"):
+    rkey = make_tid(written_at)
+    return SimpleNamespace(
+        uri=f"at://did:plc:me/app.bsky.feed.post/{rkey}",
+        value=SimpleNamespace(created_at=created_at.isoformat().replace("+00:00", "Z"), text=text),
+    )
+
+
+class FakeClient:
+    """Serves listRecords pages in order, as the PDS does, newest record key first."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = 0
+        self.com = SimpleNamespace(atproto=SimpleNamespace(repo=SimpleNamespace(list_records=self.list_records)))
+
+    async def list_records(self, params):
+        index = int(params["cursor"] or 0)
+        self.requests += 1
+        cursor = str(index + 1) if index + 1 < len(self.pages) else None
+        return SimpleNamespace(records=self.pages[index], cursor=cursor)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class TidTimestampTest(unittest.TestCase):
+    def test_round_trip(self):
+        when = utc(2024, 6, 18, 12, 30, 0)
+        self.assertEqual(tid_timestamp(make_tid(when)), when)
+
+    def test_non_tid_key(self):
+        self.assertIsNone(tid_timestamp("self"))
+
+
+class FindPostsToDeleteTest(unittest.IsolatedAsyncioTestCase):
+    async def test_backdated_page_does_not_stop_the_scan(self):
+        now = utc(2025, 1, 1)
+        pages = [
+            # Imported today, but backdated to before the window.
+            [record(now, utc(2010, 5, 1)), record(now, utc(2010, 4, 1))],
+            # Also imported today, backdated into the window.
+            [record(now, utc(2015, 6, 1), text="in window")],
+            # Written before the window, so nothing after this page can be in it.
+            [record(utc(2014, 1, 1), utc(2014, 1, 1))],
+            [record(utc(2013, 1, 1), utc(2015, 6, 1), text="never fetched")],
+        ]
+        client = FakeClient(pages)
+
+        posts = await find_posts_to_delete(client, "did:plc:me", utc(2015, 1, 1), utc(2015, 12, 31))
+
+        self.assertEqual([post["text"] for post in posts], ["in window"])
+        self.assertEqual(client.requests, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
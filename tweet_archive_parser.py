@@ -1,10 +1,73 @@
+import argparse
 import json
+import logging
+import mmap
+from sys import intern
+from operator import itemgetter
 from datetime import datetime, timedelta
-from dateutil import parser
 from pathlib import Path
 import os
 from dotenv import load_dotenv
 
+try:
+    # Optional: orjson (pip install orjson) parses a large tweets.js, and writes the metadata back out,
+    # several times faster than the json module.
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dump(obj, file, pretty=False):
+        file.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else None))
+except ImportError:
+    def _json_loads(data):
+        # json.loads doesn't take a memoryview, so the (memory-mapped) buffer is copied to bytes first.
+        return json.loads(bytes(data))
+
+    def _json_dump(obj, file, pretty=False):
+        if pretty:
+            text = json.dumps(obj, indent=2)
+        else:
+            text = json.dumps(obj, separators=(',', ':'))
+        file.write(text.encode("utf-8"))
+
+try:
+    # Optional: ijson (pip install ijson) parses tweets.js one tweet at a time, see iter_twitter_archive.
+    import ijson
+except ImportError:
+    ijson = None
+
+# Per-tweet progress goes to debug logging, so it costs nothing on a normal run over a large archive.
+logger = logging.getLogger(__name__)
+
+# Month abbreviations as they appear in the archive's `created_at`, which is always in English.
+_MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+# The `in_reply_to_*` keys the archive includes on reply tweets, and only on replies.
+_REPLY_KEYS = frozenset({
+    'in_reply_to_status_id',
+    'in_reply_to_status_id_str',
+    'in_reply_to_user_id',
+    'in_reply_to_user_id_str',
+    'in_reply_to_screen_name',
+})
+
+def created_at_sort_key(created_at):
+    """
+    Returns a sort key for a `created_at` string such as 'Wed Oct 16 22:18:35 +0000 2024'.
+
+    The archive always uses this fixed-width format in UTC, so the fields are sliced out directly
+    rather than parsed with strptime, which is slow enough to matter when sorting a whole archive.
+
+    Args:
+        created_at: The tweet's `created_at` string.
+
+    Returns:
+        A (year, month, day, 'HH:MM:SS') tuple that orders tweets chronologically.
+    """
+    return (int(created_at[26:30]), _MONTHS[created_at[4:7]], int(created_at[8:10]), created_at[11:19])
+
 class TweetArchiveParser:
     """
     A class to parse and analyze a Twitter archive.
@@ -24,9 +87,6 @@ class TweetArchiveParser:
         Loads and parses a Twitter archive from a specified file path, extracting tweet data.
         """
         
-        tweets_raw = []
-        tweets = []
-        
         try:
 
             if tweet_objects_path == None:
@@ -36,28 +96,69 @@ class TweetArchiveParser:
             if isinstance(tweet_objects_path, Path):
                 tweet_objects_path = str(tweet_objects_path) 
 
-            with open(tweet_objects_path, 'r') as file:
-                # Read the entire file content
-                file_content = file.read()  
-                
+            # Memory-map the file rather than reading it in, so with orjson a multi-GB archive is parsed
+            # straight from the page cache without first being copied into a bytes object (or a str).
+            with open(tweet_objects_path, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as file_content:
                 # Find the start of the JSON array
-                start_index = file_content.find('[')  
-                
-                # Extract the JSON array string
-                json_string = file_content[start_index:]  
-                
-                # Parse the JSON string
-                tweets_raw = json.loads(json_string)
+                start_index = file_content.find(b'[')
+
+                # Parse the JSON array, skipping the `window.YTD.tweets.part0 = ` prefix.
+                # The memoryview must be released before the mmap is closed.
+                with memoryview(file_content) as view, view[start_index:] as json_array:
+                    tweets_raw = _json_loads(json_array)
 
             #Strip out top `tweet` attributes.
-            for item in tweets_raw:
-                tweets.append(item['tweet'])
-                
-            return tweets
+            return [item['tweet'] for item in tweets_raw]
         except (json.JSONDecodeError, ValueError) as e:
             print(f"Error decoding JSON from {tweet_objects_path}: {e}")
             return []  # Or handle the error as needed
 
+    def archive_part_paths(self):
+        """
+        Returns the paths of every part of the archive's tweets.
+
+        Large archives split tweets across `tweets.js`, `tweets-part1.js`, `tweets-part2.js` and so on,
+        all in the same folder as `archive_path`.
+        """
+        archive_path = Path(self.archive_path)
+        # Callers sort the tweets by time afterwards, so the order of the parts doesn't matter.
+        return [archive_path] + sorted(archive_path.parent.glob(f"{archive_path.stem}-part*{archive_path.suffix}"))
+
+    def iter_twitter_archive(self, tweet_objects_path = None):
+        """
+        Yields the tweets of a Twitter archive one at a time.
+
+        Without a path, every part of the archive is read in turn (see archive_part_paths).
+
+        With ijson installed the archive is parsed incrementally, so a caller that filters as it goes
+        only ever holds the tweets it keeps, rather than every tweet in a possibly very large archive.
+        Without it, this falls back to load_twitter_archive.
+
+        Raises:
+            ValueError: If ijson finds a part is not valid JSON. Tweets before the error have already
+                been yielded, so the caller should discard what it collected rather than use a partial archive.
+        """
+        if tweet_objects_path == None:
+            for part_path in self.archive_part_paths():
+                yield from self.iter_twitter_archive(part_path)
+            return
+
+        if ijson is None:
+            yield from self.load_twitter_archive(tweet_objects_path)
+            return
+
+        try:
+            with open(tweet_objects_path, 'rb') as file:
+                # Skip the `window.YTD.tweets.part0 = ` prefix, so the parser starts at the JSON array.
+                start_index = file.read(1024).find(b'[')
+                file.seek(max(start_index, 0))
+
+                for item in ijson.items(file, 'item', use_float=True):
+                    yield item['tweet']
+        except ijson.JSONError as e:
+            raise ValueError(f"Error decoding JSON from {tweet_objects_path}: {e}") from e
+
     def reformat_timestamp(self, timestamp_str):
         """
         Reformats a timestamp string from the format 'Wed Oct 16 22:18:35 +0000 2024'
@@ -69,8 +170,9 @@ class TweetArchiveParser:
         Returns:
             The reformatted timestamp string.
         """
-        dt_object = datetime.strptime(timestamp_str, '%a %b %d %H:%M:%S %z %Y')
-        return dt_object.strftime('%Y-%m-%d %H:%M:%S')
+        # This runs once per tweet, and the archive's format is fixed-width, so the fields are
+        # sliced into place instead of round-tripping through strptime and strftime.
+        return f"{timestamp_str[26:30]}-{_MONTHS[timestamp_str[4:7]]:02d}-{timestamp_str[8:10]} {timestamp_str[11:19]}"
 
     def filter_out_quotes(self, tweets):
 
@@ -83,12 +185,28 @@ class TweetArchiveParser:
         
             if not is_quote:
                 not_quote_tweets.append(tweet)
-                print(f"Adding Tweet: {tweet['full_text']} ") 
+                logger.debug("Adding Tweet: %s", tweet['full_text'])
             else:
-                print(f"Tweet skipped as Quote: {tweet['full_text']} ")    
+                logger.debug("Tweet skipped as Quote: %s", tweet['full_text'])
 
         return not_quote_tweets
 
+    def is_reply(self, tweet):
+        """
+        Checks whether a tweet object is a reply.
+
+        Args:
+        tweet: A tweet object.
+
+        Returns:
+        True if the tweet has 'in_reply_to_' fields or its text starts with '@'.
+        """
+        if not _REPLY_KEYS.isdisjoint(tweet):
+            return True
+        # A direct index, after the emptiness check, is cheaper than a startswith() method call.
+        full_text = tweet.get('full_text')
+        return bool(full_text) and full_text[0] == '@'
+
     def filter_out_replies(self, tweets):
         """
         Filters out reply tweets from a list of tweet objects.
@@ -102,31 +220,21 @@ class TweetArchiveParser:
         not_reply_tweets = []
 
         for tweet in tweets:
-
-            # Check if tweet is a reply (has 'in_reply_to_' fields) or starts with '@'
-            is_reply = any(key.startswith("in_reply_to_") for key in tweet)
-
-            if tweet.get('full_text', '').startswith('@'):
-                pass
-
-            starts_with_at = tweet.get('full_text', '').startswith("@")
-        
-            if not is_reply and not starts_with_at:
-                if '@' in tweet["full_text"][0:10]:
-                    pass
+            if not self.is_reply(tweet):
                 not_reply_tweets.append(tweet)
-                print(f"Adding Tweet: {tweet['full_text']} ") 
+                logger.debug("Adding Tweet: %s", tweet['full_text'])
             else:
-                print(f"Tweet skipped as Reply: {tweet['full_text']} ")    
+                logger.debug("Tweet skipped as Reply: %s", tweet['full_text'])
                 
         return not_reply_tweets
     
-    def extract_metadata(self, tweets):
+    def extract_metadata(self, tweets, skip_replies=False):
         """
         Extracts and formats metadata from a list of tweets, including timestamps, IDs, text, and media information.
 
         Args:
-            tweets: A list of tweet objects.
+            tweets: A list (or any iterable) of tweet objects.
+            skip_replies: Leave out replies, as filter_out_replies would, in the same pass.
 
         For media, there can be up to four images or one video.     
 
@@ -136,8 +244,18 @@ class TweetArchiveParser:
         # Already sorted.     
         #tweets.sort(key=lambda tweet: datetime.strptime(tweet["created_at"], "%a %b %d %H:%M:%S +0000 %Y")) 
         
+        # Bound once here rather than looked up on every pass through the loop.
+        reformat_timestamp = self.reformat_timestamp
+        is_reply = self.is_reply
+        add_parsed_tweet = parsed_tweets.append
+
         for tweet in tweets:
-            timestamp = self.reformat_timestamp(tweet.get('created_at'))
+            reply = is_reply(tweet)
+            if skip_replies and reply:
+                logger.debug("Tweet skipped as Reply: %s", tweet.get('full_text', ''))
+                continue
+
+            timestamp = reformat_timestamp(tweet.get('created_at'))
             tweet_id = tweet.get('id', None)
             media_type = ''
 
@@ -145,9 +263,10 @@ class TweetArchiveParser:
             message = tweet.get('full_text', '')
             truncated = tweet.get('truncated', False)
             
-            hashtags = tweet.get('entities', {}).get('hashtags', [])
-            mentions = tweet.get('entities', {}).get('user_mentions', [])
-            urls = tweet.get('entities', {}).get('urls', [])
+            entities = tweet.get('entities', {})
+            hashtags = entities.get('hashtags', [])
+            mentions = entities.get('user_mentions', [])
+            urls = entities.get('urls', [])
 
             # Handle media details.
             media_filenames = [] # There may be multiple images (but never more than one video). 
@@ -160,54 +279,59 @@ class TweetArchiveParser:
                 # Grab the `media` object,
                 media_obj = tweet.get('extended_entities', {}).get('media', [])
 
-                # If there is a `tyoe` attribute, grab its value.
+                # Every media file in the archive is named after its tweet: '<tweet_id>-<file name>'.
+                filename_prefix = f"{tweet_id}-"
+
+                # Handle each media item as it comes. A tweet has up to four photos, or a single video or GIF.
                 for item in media_obj:
+                    # If there is a `type` attribute, grab its value.
                     if 'type' in item:
                         media_type = item['type']
-
-                if media_type == 'photo':
-                    print('Got at least one photo, assembling their paths' )
-                    media_filenames.append(f"{tweet_id}-{item['media_url'].split('/')[-1]}")
-
-                # Handle both videos and animated GIFs, as Twitter processes them similarly.
-                if media_type == 'video' or media_type == 'animated_gif':
-                    print(f'Got a {media_type} for tweet {tweet_id}, finding the best quality variant')
-                    
-                    best_variant = None
-                    highest_bitrate = -1
-
-                    # Check for the existence of 'video_info' and 'variants'
-                    if 'video_info' in item and 'variants' in item['video_info']:
-                        for variant in item['video_info']['variants']:
-                            # We only want mp4 files that have a bitrate specified.
-                            # Other variants can be streaming manifests (m3u8).
-                            if variant.get('content_type') == 'video/mp4' and 'bitrate' in variant:
-                                current_bitrate = int(variant['bitrate'])
-                                if current_bitrate > highest_bitrate:
-                                    highest_bitrate = current_bitrate
-                                    best_variant = variant
-                    
-                    if best_variant:
-                        media_url = best_variant['url']
-                        # Clean the URL to get a clean filename
-                        media_tag = media_url.split('/')[-1].split('?')[0]
-                        media_filenames.append(f"{tweet_id}-{media_tag}")
-                    else:
-                        # This message will appear if a video/gif has no valid mp4 variants
-                        print(f"Warning: Could not find a suitable MP4 variant for tweet {tweet_id}")
+                    item_type = item.get('type')
+
+                    if item_type == 'photo':
+                        logger.debug("Got a photo for tweet %s, assembling its path", tweet_id)
+                        media_filenames.append(filename_prefix + item['media_url'].rpartition('/')[2])
+
+                    # Handle both videos and animated GIFs, as Twitter processes them similarly.
+                    elif item_type == 'video' or item_type == 'animated_gif':
+                        logger.debug("Got a %s for tweet %s, finding the best quality variant", item_type, tweet_id)
+
+                        # We only want mp4 files that have a bitrate specified.
+                        # Other variants can be streaming manifests (m3u8).
+                        best_variant = max(
+                            (
+                                variant for variant in item.get('video_info', {}).get('variants', [])
+                                if variant.get('content_type') == 'video/mp4' and 'bitrate' in variant
+                            ),
+                            key=lambda variant: int(variant['bitrate']),
+                            default=None,
+                        )
+
+                        if best_variant:
+                            media_url = best_variant['url']
+                            # Clean the URL to get a clean filename
+                            media_tag = media_url.rpartition('/')[2].partition('?')[0]
+                            media_filenames.append(filename_prefix + media_tag)
+                        else:
+                            # This message will appear if a video/gif has no valid mp4 variants
+                            print(f"Warning: Could not find a suitable MP4 variant for tweet {tweet_id}")
         
             # Pack up anything that will be needed later, such as when posting to Bluesky    
-            parsed_tweets.append({
+            add_parsed_tweet({
                 #"timestamp": self.reformat_timestamp(tweet.get('created_at')),
                 "timestamp": timestamp,
                 "tweet_id": tweet_id,
                 #TODO: document the text/message boundaries.
                 "text": message,
                 "truncated": truncated,
+                # Carried along so get_stats can count replies without the original tweet's in_reply_to_* keys.
+                "is_reply": reply,
                 "media_type": media_type,
                 "media_filenames": media_filenames,
-                "hashtags": [h.get('text') for h in hashtags],
-                "mentions": [m.get('screen_name') for m in mentions],
+                # The same hashtags and accounts come up again and again, so each is stored once.
+                "hashtags": [intern(h['text']) for h in hashtags],
+                "mentions": [intern(m['screen_name']) for m in mentions],
                 "urls": [u.get('expanded_url') for u in urls],
             })
 
@@ -244,40 +368,39 @@ class TweetArchiveParser:
         stats['num_tweets'] = len(tweets)
         print(f"{stats['num_tweets']} Tweets in the archive.")
 
+        if not tweets:
+            return stats
+
         # Assuming tweets are already sorted by "created_at"
         stats['earliest_timestamp'] = tweets[0]["timestamp"]
         stats['latest_timestamp'] = tweets[-1]["timestamp"]
 
-        # Calculate average tweet length
-        # TODO: still text?
-        total_tweet_length = sum(len(tweet["text"]) for tweet in tweets)
-        stats['avg_tweet_length'] = total_tweet_length / stats['num_tweets']
-
+        # Tally text length, replies, hashtags, and mentions in a single pass over the tweets.
+        total_tweet_length = 0
         reply_count = 0
+        hashtag_count = 0
+        mention_count = 0
         for item in tweets:
-            is_reply = any(key.startswith("in_reply_to_") for key in item)
-            if is_reply:
+            # TODO: still text?
+            total_tweet_length += len(item["text"])
+            # Metadata written before 'is_reply' was added has no such key; count those as non-replies.
+            if item.get('is_reply', False):
                 reply_count += 1
-        print(f"Number of Reply Tweets: {reply_count}")    
+            hashtag_count += len(item['hashtags'])
+            mention_count += len(item['mentions'])
 
-        hashtag_count = 0
-        for item in tweets:
-            if len(item['hashtags']) > 0:
-                hashtag_count += len(item['hashtags'])
-        print(f"Number of #Hashtags used: {hashtag_count}")    
+        # Calculate average tweet length
+        stats['avg_tweet_length'] = total_tweet_length / stats['num_tweets']
 
-         # Let's look at mentions:
-        mention_count = 0
-        for item in tweets:
-            if len(item['mentions']) > 0:
-                mention_count += len(item['mentions'])
+        print(f"Number of Reply Tweets: {reply_count}")    
+        print(f"Number of #Hashtags used: {hashtag_count}")    
         print(f"Number of @Mentions made: {mention_count}") 
         # TODO: OK, so we can count, now let's build a collection and surface top choices, etc. 
         # TODO: and it made be good to generate a time-series of entity counts. 
 
         # Calculate daily average tweets
-        earliest_date = parser.parse(stats['earliest_timestamp']).date()
-        latest_date = parser.parse(stats['latest_timestamp']).date()
+        earliest_date = datetime.fromisoformat(stats['earliest_timestamp']).date()
+        latest_date = datetime.fromisoformat(stats['latest_timestamp']).date()
         days_spanned = (latest_date - earliest_date).days + 1  # +1 to include both start and end days
         stats['daily_avg_tweets'] = stats['num_tweets'] / days_spanned
         stats['days_spanned'] = days_spanned
@@ -292,6 +415,11 @@ def main():
 
     # TODO: Create instance of TweetParser and load the archive....
 
+    parser = argparse.ArgumentParser(description="Extract posting metadata from a Twitter archive into tweet_metadata.json.")
+    parser.add_argument('--pretty', action='store_true',
+                        help='Indent the JSON output for reading. By default it is written compactly.')
+    args = parser.parse_args()
+
     # Get the directory of the current script
     script_dir = Path(__file__).parent 
     # Construct the path to .env.local within the script's directory
@@ -307,13 +435,8 @@ def main():
     tweet_parser = TweetArchiveParser(tweet_objects_path)
 
     # Load archive file.
-    tweets = tweet_parser.load_twitter_archive(tweet_objects_path)
-
-    # Let's sort it!
-    tweets.sort(key=lambda tweet: datetime.strptime(tweet["created_at"], "%a %b %d %H:%M:%S +0000 %Y")) 
+    tweets = list(tweet_parser.iter_twitter_archive())
 
-    tweets = tweet_parser.filter_out_replies(tweets)
-    
     # Load a Tweet
     #tweet = tweets_raw[888]['tweet']
     #tweet_id = '1217911688827211777'
@@ -326,19 +449,20 @@ def main():
     
     # Tour the Tweets and cherry-pick attributes need to post to target network. 
     # Also handle the weird parsing details. Truncated Tweets? Extended entities? 
-    tweet_metadata = tweet_parser.extract_metadata(tweets)
+    # Replies are dropped in the same pass.
+    tweet_metadata = tweet_parser.extract_metadata(tweets, skip_replies=True)
+
+    # Let's sort it! The extracted 'YYYY-MM-DD HH:MM:SS' timestamps sort chronologically as plain strings.
+    tweet_metadata.sort(key=itemgetter("timestamp"))
 
-    #Set up our final list
-    tweets = []
-    
     # Create a file name for the JSON output
     output_file = script_dir / TWITTER_DATA_ROOT_FOLDER / 'tweet_metadata.json'  
 
-    # Write the tweet_metadata to a JSON file
-    with open(output_file, 'w') as f:
-        json.dump(tweet_metadata, f, indent=4)  # Use indent for pretty printing
+    # Write the tweet_metadata to a JSON file. Compact unless --pretty is given, since it is read by scripts, not people.
+    with open(output_file, 'wb') as f:
+        _json_dump(tweet_metadata, f, pretty=args.pretty)
 
-    stats = tweet_parser.get_stats(tweets)
+    stats = tweet_parser.get_stats(tweet_metadata)
     print(f"Here is the stats object: \n {stats}")
 
     print('Finished')